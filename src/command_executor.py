@@ -10,6 +10,9 @@ import shutil
 import re
 from pathlib import Path
 
+# Matches the -Path argument of PowerShell content commands
+_PATH_RE = re.compile(r'-Path\s+([^\s]+)')
+
 class CommandExecutor:
     """
     Handles the execution of commands in a safe manner, restricted to the project directory.
@@ -163,7 +166,7 @@ class CommandExecutor:
             
         # For PowerShell commands like Add-Content and Set-Content, check the -Path parameter
         if cmd_parts[0] in ['add-content', 'set-content', 'new-item']:
-            path_match = re.search(r'-Path\s+([^\s]+)', command)
+            path_match = _PATH_RE.search(command)
             if path_match:
                 path = path_match.group(1).strip('"\'')
                 return self.is_path_in_project(path)
@@ -269,7 +272,7 @@ class CommandExecutor:
         # Special case: Set-Content with triple quotes for Python script
         if command.startswith('Set-Content') and '-Path' in command and '-Value' in command:
             # Extract path
-            path_match = re.search(r'-Path\s+([^\s]+)', command)
+            path_match = _PATH_RE.search(command)
             if path_match:
                 filepath = path_match.group(1).strip('"\'')
                 
@@ -313,7 +316,7 @@ class CommandExecutor:
         """
         try:
             # Extract path
-            path_match = re.search(r'-Path\s+([^\s]+)', command)
+            path_match = _PATH_RE.search(command)
             if not path_match:
                 return False, None, "Invalid Set-Content command format: missing -Path"
                 
@@ -505,7 +508,7 @@ $Error.Clear();
         """
         try:
             # Extract path
-            path_match = re.search(r'-Path\s+([^\s]+)', command)
+            path_match = _PATH_RE.search(command)
             if not path_match:
                 return False, None, "Invalid command format: missing -Path"
                 
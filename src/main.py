@@ -154,8 +154,20 @@ class ChatWindow(QMainWindow):
         timer.timeout.connect(loop.quit)
         self.worker.finished.connect(loop.quit)
         self.worker.error.connect(loop.quit)
-        timer.start(timeout)
-        loop.exec_()
+        
+        # The worker may have emitted before the connections above existed, so also
+        # quit as soon as the thread is seen to have finished
+        poll = QTimer()
+        poll.timeout.connect(lambda: self.worker.isFinished() and loop.quit())
+        
+        if not self.worker.isFinished():
+            poll.start(10)
+            timer.start(timeout)
+            loop.exec_()
+            poll.stop()
+        
+        # Deliver any finished/error signals still queued from the worker thread
+        QApplication.processEvents()
     
     def send_message(self):
         """
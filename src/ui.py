@@ -4,8 +4,7 @@ UI components for the Pseudo Developer application.
 This module contains the UI layout and component setup for the chat application.
 """
 
-import os
-from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout,
                            QTextEdit, QPushButton, QLineEdit, QLabel,
                            QStatusBar, QSplitter)
 from PyQt5.QtCore import Qt
@@ -1,13 +1,34 @@
 """Test configuration and shared fixtures."""
 import os
+import shutil
 import sys
+import uuid
+from types import SimpleNamespace
 import pytest
+
+# Render headlessly; must be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QApplication
 
 # Add project root to Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
+from src import chat_client
+from src.main import ChatWindow
+
+def pytest_collection_modifyitems(config, items):
+    """Skip tests marked powershell when PowerShell is not installed."""
+    # CommandExecutor starts its session with the "powershell" executable
+    if shutil.which("powershell"):
+        return
+    skip_powershell = pytest.mark.skip(reason="PowerShell is not available")
+    for item in items:
+        if "powershell" in item.keywords:
+            item.add_marker(skip_powershell)
+
 # Store QApplication reference to prevent garbage collection
 _qapp = None
 
@@ -15,5 +36,135 @@ _qapp = None
 def app():
     """Fixture to create QApplication instance."""
     global _qapp
-    _qapp = QApplication([])
-    return _qapp
\ No newline at end of file
+    QApplication.setAttribute(Qt.AA_DontUseNativeDialogs)
+    # One QApplication per process (each xdist worker is its own process)
+    _qapp = QApplication.instance() or QApplication([])
+    # Drain startup events once for the whole session; tests never need a live event loop
+    _qapp.processEvents()
+    return _qapp
+
+def _record_appends(text_edit):
+    """Mirror everything appended to a text edit into its _test_log list (reset on clear)."""
+    text_edit._test_log = []
+    append, clear = text_edit.append, text_edit.clear
+    
+    def _append(text):
+        text_edit._test_log.append(text)
+        append(text)
+    
+    def _clear():
+        text_edit._test_log.clear()
+        clear()
+    
+    text_edit.append = _append
+    text_edit.clear = _clear
+
+class _Completions:
+    """Stand-in for the OpenAI chat completions endpoint."""
+    # Prebuilt once: an empty assistant reply in the shape ChatClient parses
+    _response = SimpleNamespace(choices=[SimpleNamespace(
+        message=SimpleNamespace(content='{"message": "", "commands": []}'))])
+
+    def create(self, **kwargs):
+        """Return the prebuilt empty response without touching the network."""
+        return self._response
+
+class _Chat:
+    """Stand-in for the OpenAI chat namespace."""
+    completions = _Completions()
+
+class _StubOpenAI:
+    """Lightweight static stand-in for the OpenAI client."""
+
+    def __init__(self, api_key="test-key", **kwargs):
+        self.api_key = api_key
+        self.chat = _Chat()
+
+@pytest.fixture(scope="session", autouse=True)
+def _stub_openai():
+    """Fixture to keep every ChatClient in the session from constructing a real OpenAI client."""
+    # ChatClient imports the class by name, so patch the reference it actually calls
+    original = chat_client.OpenAI
+    chat_client.OpenAI = _StubOpenAI
+    yield
+    chat_client.OpenAI = original
+
+@pytest.fixture(scope="session")
+def mock_openai_client():
+    """Fixture for a stub OpenAI client."""
+    return _StubOpenAI()
+
+# Responses handed out by the shared window's chat client, oldest first
+_response_queue = []
+
+def _queued_response(*args, **kwargs):
+    """Stand-in for ChatClient.get_response that replays the queued responses in order."""
+    if not _response_queue:
+        return {"message": "", "commands": []}
+    response = _response_queue.pop(0)
+    # Queued exceptions are raised, as if the API call itself had failed
+    if isinstance(response, Exception):
+        raise response
+    return response
+
+@pytest.fixture(scope="session")
+def _chat_window_template(app, mock_openai_client):
+    """Fixture to create a single ChatWindow instance shared by the whole session."""
+    window = ChatWindow(openai_client=mock_openai_client)
+    window._in_test = True
+    ui = window.ui
+    # Tests only read the displays' text, so skip repainting them on every append
+    ui.chat_display.setUpdatesEnabled(False)
+    ui.cmd_display.setUpdatesEnabled(False)
+    # Nothing undoes edits in tests, so don't record them; cap document growth as well
+    for text_edit in (ui.chat_display, ui.cmd_display, ui.message_input):
+        text_edit.document().setUndoRedoEnabled(False)
+        text_edit.document().setMaximumBlockCount(10000)
+    _record_appends(ui.chat_display)
+    _record_appends(ui.cmd_display)
+    window.chat_client.get_response = _queued_response
+    return window
+
+@pytest.fixture
+def chat_window(_chat_window_template):
+    """Fixture to provide the shared ChatWindow reset to a freshly constructed state."""
+    window = _chat_window_template
+    ui = window.ui
+    ui.chat_display.clear()
+    ui.cmd_display.clear()
+    ui.message_input.clear()
+    ui.dir_input.clear()
+    ui.status_bar.clearMessage()
+    window.message_history.clear()
+    _response_queue.clear()
+    window.project_dir = None
+    window.command_executor.set_project_dir(None)
+    try:
+        yield window
+    finally:
+        # Drop per-test method overrides so the shared window uses the real methods again
+        vars(window.command_executor).pop("execute_commands", None)
+
+@pytest.fixture
+def response_queue():
+    """Fixture to provide the queue of responses the shared window's chat client returns."""
+    _response_queue.clear()
+    return _response_queue
+
+@pytest.fixture(scope="session")
+def _session_tmp(tmp_path_factory):
+    """Fixture to create one temporary root directory shared by the whole session."""
+    return tmp_path_factory.mktemp("tests")
+
+@pytest.fixture
+def temp_dir(_session_tmp):
+    """Fixture to create a per-test temporary directory under the shared root."""
+    # Short random names stay unique across modules and well clear of Windows path limits
+    path = _session_tmp / f"proj_{uuid.uuid4().hex}"
+    path.mkdir()
+    return path
+
+@pytest.fixture(scope="session")
+def large_blob():
+    """Fixture for text content larger than CommandExecutor.CHUNK_SIZE (8KB)."""
+    return "Large content! " * 1000
@@ -2,204 +2,327 @@
 import pytest
 import os
 import json
-from unittest.mock import MagicMock, patch
-from src.main import ChatWindow
+import subprocess
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from pyfakefs.fake_filesystem import FakeFilesystem
+from pyfakefs.fake_os import FakeOsModule
+from src.chat_client import ChatClient
+from src.command_executor import CommandExecutor
+
+# Project directory for tests that never touch the filesystem
+_FAKE_PROJECT_DIR = "C:/test/project"
+
+# Absolute path outside any test project directory, valid on every platform
+_OUTSIDE_PATH = os.path.abspath(os.sep + "outside")
+
+# (command, expected_safe) pairs checked against a project rooted at _FAKE_PROJECT_DIR
+_SAFE_CASES = (
+    ("dir", True),
+    ("type test.txt", True),
+    ("del test.txt", True),
+    ("rm file.txt", True),
+    ("move file.txt newfile.txt", True),
+    ("ren oldname.txt newname.txt", True),
+    ("rmdir test", True),
+    ("rd temp", True),
+    ("format C:", False),
+    ("..\\file.txt", False),
+    ("~\\file.txt", False),
+    (f"type {_OUTSIDE_PATH}", False),
+)
 
-@pytest.fixture
-def mock_openai_client():
-    """Fixture for mocked OpenAI client."""
-    mock_client = MagicMock()
-    return mock_client
+# Cases using drive-letter paths, which elsewhere resolve as relative paths inside the project
+_windows_only = pytest.mark.skipif(os.name != "nt", reason="drive-letter paths are only absolute on Windows")
 
-@pytest.fixture
-def chat_window(app, mock_openai_client):
-    """Fixture to create ChatWindow instance with mocked OpenAI client."""
-    window = ChatWindow(openai_client=mock_openai_client)
-    window._in_test = True
-    return window
+# Script written by the here-string and Set-Content file write tests
+_HELLO_SCRIPT = '''def hello():
+    print("Hello, World!")
+    return 42
 
-@pytest.fixture
-def temp_dir(tmpdir):
-    """Fixture to create a temporary directory for testing."""
-    return tmpdir
+if __name__ == "__main__":
+    result = hello()
+    print(f"Result: {result}")'''
+
+# Canned chat client responses and command results shared by the tests below
+_API_ERR = Exception("API Error")
+_RESP_TEXT = {"message": "Test AI response", "commands": []}
+_HISTORY_RESPS = (
+    {"message": "Response 1", "commands": []},
+    {"message": "Response 2", "commands": []},
+)
+_MOCK_DIR_RESP = {
+    "message": "Running a command",
+    "commands": [
+        {"command": "dir", "description": "List directory contents"}
+    ]
+}
+_MOCK_DIR_RESULTS = [{
+    "command": "dir",
+    "description": "List directory contents",
+    "stdout": "Directory listing output",
+    "stderr": "",
+    "is_safe": True
+}]
+_MOCK_UNSAFE_RESP = {
+    "message": "Running unsafe command",
+    "commands": [
+        {"command": "format C:", "description": "Format drive"}
+    ]
+}
+_MOCK_ERROR_RESP = {
+    "message": "Running command with error",
+    "commands": [
+        {"command": "invalid_cmd", "description": "Run invalid command"}
+    ]
+}
+_MOCK_ERROR_RESULTS = [{
+    "command": "invalid_cmd",
+    "description": "Run invalid command",
+    "stdout": "",
+    "stderr": "Command not found",
+    "is_safe": True
+}]
+_MOCK_MULTI_RESP = {
+    "message": "Running multiple commands",
+    "commands": [
+        {"command": "dir", "description": "List directory contents"},
+        {"command": "echo Hello", "description": "Print hello message"}
+    ]
+}
+_MOCK_MULTI_RESULTS = [
+    {
+        "command": "dir",
+        "description": "List directory contents",
+        "stdout": "Directory listing output",
+        "stderr": "",
+        "is_safe": True
+    },
+    {
+        "command": "echo Hello",
+        "description": "Print hello message",
+        "stdout": "Hello",
+        "stderr": "",
+        "is_safe": True
+    }
+]
+
+class _Msg:
+    """Minimal stand-in for an OpenAI chat completion message."""
+    __slots__ = ('content',)
+
+    def __init__(self, content):
+        self.content = content
+
+class _Choice:
+    """Minimal stand-in for an OpenAI chat completion choice."""
+    __slots__ = ('message',)
+
+    def __init__(self, message):
+        self.message = message
+
+class _Resp:
+    """Minimal stand-in for an OpenAI chat completion response."""
+    __slots__ = ('choices',)
+
+    def __init__(self, choices):
+        self.choices = choices
+
+def _resp_json(message, commands=()):
+    """Serialize an assistant response the way the API returns it as message content."""
+    return json.dumps({"message": message, "commands": list(commands)})
+
+def _openai_stub(content):
+    """Build a stub OpenAI client whose completions always return the given content."""
+    response = _Resp(choices=[_Choice(message=_Msg(content=content))])
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **_: response)))
+
+def _const(value):
+    """Build a stand-in callable that accepts any arguments and returns value."""
+    return lambda *args, **kwargs: value
+
+def _raiser(exc):
+    """Build a stand-in callable that accepts any arguments and raises exc."""
+    def _raise(*args, **kwargs):
+        raise exc
+    return _raise
+
+def _display_text(text_edit):
+    """Get the text appended to a recorded text edit without serializing its Qt document."""
+    return "\n".join(text_edit._test_log)
+
+def _assert_contains(content, *needles):
+    """Assert that every needle occurs in content, reporting all the missing ones at once."""
+    missing = [needle for needle in needles if needle not in content]
+    assert not missing, missing
+
+@pytest.fixture(scope="module")
+def cmd_executor():
+    """Fixture to create a CommandExecutor for pure validation tests (no ChatWindow needed)."""
+    command_executor = CommandExecutor()
+    command_executor.set_project_dir(_FAKE_PROJECT_DIR)
+    return command_executor
 
 @pytest.fixture
-def chat_window_with_project(chat_window, temp_dir):
-    """Fixture to create ChatWindow instance with project directory set."""
-    test_path = os.path.join(temp_dir, "test_project")
-    chat_window.ui.dir_input.setText(str(test_path))
-    chat_window.save_project_directory()
+def chat_window_fast_project(chat_window):
+    """Fixture to create ChatWindow instance with a project directory set, without touching the disk."""
+    chat_window.project_dir = _FAKE_PROJECT_DIR
+    chat_window.command_executor.set_project_dir(_FAKE_PROJECT_DIR)
     return chat_window
 
 @pytest.fixture
-def mock_popen():
-    """Fixture for mocked subprocess.Popen"""
-    with patch('subprocess.Popen') as mock:
-        yield mock
+def fake_os(monkeypatch):
+    """Fixture to run src.main's os calls against an in-memory pyfakefs filesystem."""
+    # Patching the one module under test avoids the fs fixture's scan of every loaded module
+    fake = FakeOsModule(FakeFilesystem())
+    monkeypatch.setattr("src.main.os", fake)
+    return fake
+
+@pytest.fixture
+def project_executor(temp_dir):
+    """Fixture to create a CommandExecutor rooted at a real project directory (no ChatWindow needed)."""
+    project_dir = temp_dir / "test_project"
+    project_dir.mkdir()
+    return CommandExecutor(project_dir=os.path.abspath(project_dir))
 
-def test_message_input_clear_on_send(chat_window_with_project):
+def test_message_input_clear_on_send(chat_window_fast_project):
     """Test that message input is cleared after sending."""
     test_message = "Test message"
-    chat_window_with_project.ui.message_input.setText(test_message)
-    chat_window_with_project.send_message()
-    assert chat_window_with_project.ui.message_input.toPlainText() == ""
-
-def test_empty_message_not_sent(chat_window_with_project):
-    """Test that empty messages are not sent."""
-    chat_window_with_project.ui.message_input.setText("")
-    initial_content = chat_window_with_project.ui.chat_display.toPlainText()
-    chat_window_with_project.send_message()
-    assert chat_window_with_project.ui.chat_display.toPlainText() == initial_content
-
-def test_whitespace_message_not_sent(chat_window_with_project):
-    """Test that whitespace-only messages are not sent."""
-    chat_window_with_project.ui.message_input.setText("   \n   ")
-    initial_content = chat_window_with_project.ui.chat_display.toPlainText()
-    chat_window_with_project.send_message()
-    assert chat_window_with_project.ui.chat_display.toPlainText() == initial_content
-
-def test_successful_message_send_and_display(chat_window_with_project, monkeypatch):
+    chat_window_fast_project.ui.message_input.setText(test_message)
+    chat_window_fast_project.send_message()
+    assert chat_window_fast_project.ui.message_input.toPlainText() == ""
+
+@pytest.mark.parametrize("message", ["", "   \n   "], ids=["empty", "whitespace"])
+def test_blank_message_not_sent(chat_window_fast_project, message):
+    """Test that empty and whitespace-only messages are not sent."""
+    chat_window_fast_project.ui.message_input.setText(message)
+    initial_content = _display_text(chat_window_fast_project.ui.chat_display)
+    chat_window_fast_project.send_message()
+    assert _display_text(chat_window_fast_project.ui.chat_display) == initial_content
+
+def test_successful_message_send_and_display(chat_window_fast_project, response_queue):
     """Test successful message sending and response display."""
-    # Mock the chat_client.get_response method
-    mock_response = {"message": "Test AI response", "commands": []}
-    
-    def mock_get_response(*args, **kwargs):
-        return mock_response
-        
-    monkeypatch.setattr(chat_window_with_project.chat_client, "get_response", mock_get_response)
+    # Queue the chat client response
+    response_queue.append(_RESP_TEXT)
     
     # Send test message
     test_message = "Test message"
-    chat_window_with_project.ui.message_input.setText(test_message)
-    chat_window_with_project.send_message()
+    chat_window_fast_project.ui.message_input.setText(test_message)
+    chat_window_fast_project.send_message()
     
     # Verify message flow
-    display_content = chat_window_with_project.ui.chat_display.toPlainText()
-    assert f"You: {test_message}" in display_content
-    assert "AI:" in display_content
-    assert "Test AI response" in display_content
+    display_content = _display_text(chat_window_fast_project.ui.chat_display)
+    _assert_contains(display_content, f"You: {test_message}", "AI:", "Test AI response")
 
-def test_api_error_handling_and_display(chat_window_with_project, monkeypatch):
+def test_wait_for_worker_after_worker_finished(chat_window_fast_project, response_queue, monkeypatch):
+    """Test that waiting on a worker that has already finished still delivers its result."""
+    # Queue the chat client response
+    response_queue.append(_RESP_TEXT)
+    
+    # Send without the built-in test wait, and let the worker finish before waiting on it
+    monkeypatch.setattr(chat_window_fast_project, "_in_test", False)
+    chat_window_fast_project.ui.message_input.setText("Test message")
+    chat_window_fast_project.send_message()
+    chat_window_fast_project.worker.wait()
+    
+    chat_window_fast_project._wait_for_worker()
+    
+    # Verify the worker is done and its result reached the display
+    assert chat_window_fast_project.worker.isFinished()
+    display_content = _display_text(chat_window_fast_project.ui.chat_display)
+    _assert_contains(display_content, "AI:", "Test AI response")
+
+@pytest.mark.parametrize("expected", [_RESP_TEXT, _MOCK_DIR_RESP], ids=["message_only", "with_commands"])
+def test_chat_client_parses_json_response(expected):
+    """Test that the chat client returns the parsed JSON content of the API response."""
+    chat_client = ChatClient(api_key="test-key")
+    chat_client.client = _openai_stub(_resp_json(expected["message"], expected["commands"]))
+    
+    response = chat_client.get_response([{"role": "user", "content": "Test message"}], _FAKE_PROJECT_DIR)
+    assert response == expected
+
+def test_chat_client_returns_error_message_on_api_failure():
+    """Test that API failures are turned into an error message with no commands."""
+    chat_client = ChatClient(api_key="test-key")
+    chat_client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=_raiser(_API_ERR))))
+    
+    response = chat_client.get_response([{"role": "user", "content": "Test message"}], _FAKE_PROJECT_DIR)
+    assert response == {"message": "Error: API Error", "commands": []}
+
+def test_api_error_handling_and_display(chat_window_fast_project, response_queue):
     """Test error handling and error message display."""
-    def mock_get_response(*args, **kwargs):
-        raise Exception("API Error")
-        
-    monkeypatch.setattr(chat_window_with_project.chat_client, "get_response", mock_get_response)
+    # Queue an API error for the chat client to raise
+    response_queue.append(_API_ERR)
     
     # Send test message
     test_message = "Test message"
-    chat_window_with_project.ui.message_input.setText(test_message)
-    chat_window_with_project.send_message()
+    chat_window_fast_project.ui.message_input.setText(test_message)
+    chat_window_fast_project.send_message()
     
     # Verify error handling
-    display_content = chat_window_with_project.ui.chat_display.toPlainText()
-    assert f"You: {test_message}" in display_content
-    assert "Error:" in display_content
+    display_content = _display_text(chat_window_fast_project.ui.chat_display)
+    _assert_contains(display_content, f"You: {test_message}", "Error:")
 
-def test_message_history_preservation(chat_window_with_project, monkeypatch):
+def test_message_history_preservation(chat_window_fast_project, response_queue):
     """Test that chat history is preserved when sending multiple messages."""
-    responses = [
-        {"message": "Response 1", "commands": []},
-        {"message": "Response 2", "commands": []}
-    ]
-    response_iter = iter(responses)
-    
-    def mock_get_response(*args, **kwargs):
-        return next(response_iter)
-        
-    monkeypatch.setattr(chat_window_with_project.chat_client, "get_response", mock_get_response)
+    # Queue the chat client responses, one per message
+    response_queue.extend(_HISTORY_RESPS)
     
     # First message
-    chat_window_with_project.ui.message_input.setText("Message 1")
-    chat_window_with_project.send_message()
+    chat_window_fast_project.ui.message_input.setText("Message 1")
+    chat_window_fast_project.send_message()
     
     # Second message
-    chat_window_with_project.ui.message_input.setText("Message 2")
-    chat_window_with_project.send_message()
+    chat_window_fast_project.ui.message_input.setText("Message 2")
+    chat_window_fast_project.send_message()
+    
+    # Verify each message consumed exactly one queued response
+    assert not response_queue
     
     # Verify chat history
-    display_content = chat_window_with_project.ui.chat_display.toPlainText()
-    assert "You: Message 1" in display_content
-    assert "Response 1" in display_content
-    assert "You: Message 2" in display_content
-    assert "Response 2" in display_content
-
-def test_command_execution(chat_window_with_project, monkeypatch):
+    display_content = _display_text(chat_window_fast_project.ui.chat_display)
+    _assert_contains(
+        display_content,
+        "You: Message 1",
+        "Response 1",
+        "You: Message 2",
+        "Response 2",
+    )
+
+def test_command_execution(chat_window_fast_project, response_queue):
     """Test execution of commands from AI response."""
-    # Mock the chat_client.get_response method
-    mock_response = {
-        "message": "Running a command", 
-        "commands": [
-            {"command": "dir", "description": "List directory contents"}
-        ]
-    }
-    
-    def mock_get_response(*args, **kwargs):
-        return mock_response
-        
-    # Mock the command executor
-    mock_results = [{
-        "command": "dir",
-        "description": "List directory contents",
-        "stdout": "Directory listing output",
-        "stderr": "",
-        "is_safe": True
-    }]
-    
-    def mock_execute_commands(*args, **kwargs):
-        return mock_results
-        
-    monkeypatch.setattr(chat_window_with_project.chat_client, "get_response", mock_get_response)
-    monkeypatch.setattr(chat_window_with_project.command_executor, "execute_commands", mock_execute_commands)
+    # Queue the chat client response and mock the command execution results
+    response_queue.append(_MOCK_DIR_RESP)
+    chat_window_fast_project.command_executor.execute_commands = _const(_MOCK_DIR_RESULTS)
     
     # Send test message
-    chat_window_with_project.ui.message_input.setText("Run a command")
-    chat_window_with_project.send_message()
+    chat_window_fast_project.ui.message_input.setText("Run a command")
+    chat_window_fast_project.send_message()
     
     # Verify command execution and output display
-    cmd_content = chat_window_with_project.ui.cmd_display.toPlainText()
-    assert "Executing 1 commands sequentially" in cmd_content
-    assert "List directory contents" in cmd_content
-    assert "Command: dir" in cmd_content
-    assert "Output:\nDirectory listing output" in cmd_content
-
-def test_unsafe_command_not_executed(chat_window_with_project, monkeypatch):
+    cmd_content = _display_text(chat_window_fast_project.ui.cmd_display)
+    _assert_contains(
+        cmd_content,
+        "Executing 1 commands sequentially",
+        "List directory contents",
+        "Command: dir",
+        "Output:\nDirectory listing output",
+    )
+
+@pytest.mark.xdist_group("os_patches")
+def test_unsafe_command_not_executed(chat_window_fast_project, response_queue, monkeypatch):
     """Test that unsafe commands are not executed."""
-    # Mock the chat_client.get_response method
-    unsafe_command = "format C:"
-    mock_response = {
-        "message": "Running unsafe command", 
-        "commands": [
-            {"command": unsafe_command, "description": "Format drive"}
-        ]
-    }
-    
-    def mock_get_response(*args, **kwargs):
-        return mock_response
-        
-    # Mock the command executor
-    mock_results = [{
-        "command": unsafe_command,
-        "description": "Format drive",
-        "stdout": None,
-        "stderr": None,
-        "is_safe": False
-    }]
-    
-    def mock_execute_commands(*args, **kwargs):
-        return mock_results
-        
-    monkeypatch.setattr(chat_window_with_project.chat_client, "get_response", mock_get_response)
-    monkeypatch.setattr(chat_window_with_project.command_executor, "execute_commands", mock_execute_commands)
+    # Queue the chat client response; the real executor must reject the command
+    response_queue.append(_MOCK_UNSAFE_RESP)
+    monkeypatch.setattr(subprocess, "Popen", _raiser(AssertionError("Popen should not be called")))
     
     # Send test message
-    chat_window_with_project.ui.message_input.setText("Run unsafe command")
-    chat_window_with_project.send_message()
+    chat_window_fast_project.ui.message_input.setText("Run unsafe command")
+    chat_window_fast_project.send_message()
     
     # Verify command rejection
-    cmd_content = chat_window_with_project.ui.cmd_display.toPlainText()
-    assert "Command rejected for security reasons" in cmd_content
-    assert unsafe_command in cmd_content
+    cmd_content = _display_text(chat_window_fast_project.ui.cmd_display)
+    _assert_contains(cmd_content, "Command rejected for security reasons", "format C:")
 
 def test_no_project_dir_message(chat_window):
     """Test that messages can't be sent without setting project directory."""
@@ -207,186 +330,125 @@ def test_no_project_dir_message(chat_window):
     chat_window.ui.message_input.setText(test_message)
     chat_window.send_message()
     
-    output_content = chat_window.ui.cmd_display.toPlainText()
+    output_content = _display_text(chat_window.ui.cmd_display)
     assert "Please set a project directory first" in output_content
 
 def test_save_project_dir_sets_absolute_path(chat_window, temp_dir):
     """Test that saving project directory stores absolute path."""
-    test_path = os.path.join(temp_dir, "test_project")
+    test_path = temp_dir / "test_project"
     chat_window.ui.dir_input.setText(str(test_path))
     chat_window.save_project_directory()
     
-    assert chat_window.project_dir == os.path.abspath(test_path)
+    expected = os.path.abspath(test_path)
+    assert chat_window.project_dir == expected
     # Also verify CommandExecutor was updated
-    assert chat_window.command_executor.project_dir == os.path.abspath(test_path)
-
-def test_save_project_directory_empty_path(chat_window):
-    """Test that trying to save an empty directory path shows error in status bar."""
-    chat_window.ui.dir_input.setText("")
-    chat_window.save_project_directory()
-    
-    assert chat_window.ui.status_bar.currentMessage().startswith("Error: Please enter")
-
-def test_save_project_directory_success(chat_window, temp_dir):
-    """Test successful creation and saving of project directory."""
-    test_path = os.path.join(temp_dir, "test_project")
-    chat_window.ui.dir_input.setText(str(test_path))
+    assert chat_window.command_executor.project_dir == expected
+
+@pytest.mark.xdist_group("os_patches")
+@pytest.mark.parametrize("path, makedirs_error, expected_prefix, expect_saved", [
+    ("", None, "Error: Please enter", False),
+    ("/proj/test_project", None, "Success: Directory saved", True),
+    ("/invalid/path", PermissionError("Access denied"), "Error: Failed to create", False),
+], ids=["empty_path", "success", "error"])
+def test_save_project_directory(chat_window, fake_os, monkeypatch, path, makedirs_error, expected_prefix, expect_saved):
+    """Test saving an empty, a valid and an uncreatable project directory path."""
+    if makedirs_error:
+        # Mock os.makedirs to raise an error
+        makedirs = MagicMock(side_effect=makedirs_error)
+        monkeypatch.setattr(fake_os, "makedirs", makedirs)
+    
+    chat_window.ui.dir_input.setText(path)
     chat_window.save_project_directory()
     
-    assert os.path.exists(test_path)
-    assert chat_window.ui.status_bar.currentMessage().startswith("Success: Directory saved")
-    assert chat_window.project_dir == os.path.abspath(test_path)
-
-def test_save_project_directory_error(chat_window, monkeypatch):
-    """Test handling of directory creation error."""
-    # Mock os.makedirs to raise an error
-    def mock_makedirs(*args, **kwargs):
-        raise PermissionError("Access denied")
-    monkeypatch.setattr(os, "makedirs", mock_makedirs)
-    
-    chat_window.ui.dir_input.setText("/invalid/path")
-    chat_window.save_project_directory()
-    
-    assert chat_window.ui.status_bar.currentMessage().startswith("Error: Failed to create")
-
-@pytest.mark.parametrize("command,expected_safe", [
-    ("dir", True),
-    ("type test.txt", True),
-    ("del test.txt", True),
-    ("rm file.txt", True),
-    ("move file.txt newfile.txt", True),
-    ("ren oldname.txt newname.txt", True),
-    ("rmdir test", True),
-    ("rd temp", True),
-    ("format C:", False),
-    ("..\\file.txt", False),
-    ("~\\file.txt", False),
-    ("C:\\outside\\path", False),
-])
-def test_is_safe_command(chat_window_with_project, command, expected_safe):
+    if makedirs_error:
+        makedirs.assert_called_once_with(path, exist_ok=True)
+    assert chat_window.ui.status_bar.currentMessage().startswith(expected_prefix)
+    assert fake_os.path.isdir(path) == expect_saved
+    if expect_saved:
+        expected = os.path.abspath(path)
+        assert chat_window.project_dir == expected
+        # Also verify CommandExecutor was updated
+        assert chat_window.command_executor.project_dir == expected
+    else:
+        # A failed save leaves no project directory on the window or its CommandExecutor
+        assert chat_window.project_dir is None
+        assert chat_window.command_executor.project_dir is None
+
+def test_is_safe_command(cmd_executor):
     """Test command safety validation with various commands."""
-    # Set project directory for consistent testing
-    chat_window_with_project.command_executor.set_project_dir("C:/test/project")
-    assert chat_window_with_project.command_executor.is_safe_command(command) == expected_safe
+    for command, expected_safe in _SAFE_CASES:
+        assert cmd_executor.is_safe_command(command) == expected_safe, command
+
+@_windows_only
+def test_is_safe_command_rejects_path_outside_project(cmd_executor):
+    """Test that commands referencing a drive path outside the project are rejected."""
+    assert not cmd_executor.is_safe_command("C:\\outside\\path")
 
-def test_command_error_display(chat_window_with_project, monkeypatch):
+def test_command_error_display(chat_window_fast_project, response_queue):
     """Test that command errors are properly displayed."""
-    # Mock chat client and command executor
-    mock_response = {
-        "message": "Running command with error",
-        "commands": [
-            {"command": "invalid_cmd", "description": "Run invalid command"}
-        ]
-    }
-    
-    def mock_get_response(*args, **kwargs):
-        return mock_response
-        
-    # Mock command execution with error
-    mock_results = [{
-        "command": "invalid_cmd",
-        "description": "Run invalid command",
-        "stdout": "",
-        "stderr": "Command not found",
-        "is_safe": True
-    }]
-    
-    def mock_execute_commands(*args, **kwargs):
-        return mock_results
-        
-    monkeypatch.setattr(chat_window_with_project.chat_client, "get_response", mock_get_response)
-    monkeypatch.setattr(chat_window_with_project.command_executor, "execute_commands", mock_execute_commands)
+    # Queue the chat client response and mock the command execution results
+    response_queue.append(_MOCK_ERROR_RESP)
+    chat_window_fast_project.command_executor.execute_commands = _const(_MOCK_ERROR_RESULTS)
     
     # Send test message
-    chat_window_with_project.ui.message_input.setText("Run command with error")
-    chat_window_with_project.send_message()
+    chat_window_fast_project.ui.message_input.setText("Run command with error")
+    chat_window_fast_project.send_message()
     
     # Verify error display
-    cmd_content = chat_window_with_project.ui.cmd_display.toPlainText()
-    assert "Run invalid command" in cmd_content
-    assert "Command: invalid_cmd" in cmd_content
-    assert "Error:\nCommand not found" in cmd_content
-
-def test_message_history_limit(chat_window_with_project, monkeypatch):
+    cmd_content = _display_text(chat_window_fast_project.ui.cmd_display)
+    _assert_contains(
+        cmd_content,
+        "Run invalid command",
+        "Command: invalid_cmd",
+        "Error:\nCommand not found",
+    )
+
+def test_message_history_limit(chat_window_fast_project):
     """Test that message history is limited to maxlen messages."""
-    # Create a mock response that always returns the same data
-    mock_response = {"message": "Response", "commands": []}
-    
-    def mock_get_response(*args, **kwargs):
-        return mock_response
-        
-    monkeypatch.setattr(chat_window_with_project.chat_client, "get_response", mock_get_response)
-    
     # Get the current maxlen
-    maxlen = chat_window_with_project.message_history.maxlen
+    history = chat_window_fast_project.message_history
+    maxlen = history.maxlen
     
-    # Send more messages than the maximum
-    num_extra_messages = 5
-    for i in range(maxlen + num_extra_messages):
-        chat_window_with_project.ui.message_input.setText(f"Message {i}")
-        chat_window_with_project.send_message()
+    # Add more message pairs than the history can hold
+    num_pairs = maxlen // 2 + 5
+    added = []
+    for i in range(num_pairs):
+        chat_window_fast_project.add_to_history(f"Message {i}", f"Response {i}")
+        added += [("user", f"Message {i}"), ("assistant", f"Response {i}")]
     
-    # Verify message history length is limited to maxlen
-    assert len(chat_window_with_project.message_history) == maxlen
+    # Verify message history keeps only the newest maxlen messages
+    assert len(history) == maxlen
+    assert list(history) == added[-maxlen:]
 
-def test_multiple_commands_executed_sequentially(chat_window_with_project, monkeypatch):
+def test_multiple_commands_executed_sequentially(chat_window_fast_project, response_queue):
     """Test that multiple commands are executed sequentially."""
-    # Mock the chat_client.get_response method with multiple commands
-    mock_response = {
-        "message": "Running multiple commands", 
-        "commands": [
-            {"command": "dir", "description": "List directory contents"},
-            {"command": "echo Hello", "description": "Print hello message"}
-        ]
-    }
-    
-    def mock_get_response(*args, **kwargs):
-        return mock_response
-        
-    # Mock command execution results
-    mock_results = [
-        {
-            "command": "dir",
-            "description": "List directory contents",
-            "stdout": "Directory listing output",
-            "stderr": "",
-            "is_safe": True
-        },
-        {
-            "command": "echo Hello",
-            "description": "Print hello message",
-            "stdout": "Hello",
-            "stderr": "",
-            "is_safe": True
-        }
-    ]
-    
-    def mock_execute_commands(*args, **kwargs):
-        return mock_results
-        
-    monkeypatch.setattr(chat_window_with_project.chat_client, "get_response", mock_get_response)
-    monkeypatch.setattr(chat_window_with_project.command_executor, "execute_commands", mock_execute_commands)
+    # Queue the chat client response and mock the command execution results
+    response_queue.append(_MOCK_MULTI_RESP)
+    chat_window_fast_project.command_executor.execute_commands = _const(_MOCK_MULTI_RESULTS)
     
     # Send test message
-    chat_window_with_project.ui.message_input.setText("Run multiple commands")
-    chat_window_with_project.send_message()
+    chat_window_fast_project.ui.message_input.setText("Run multiple commands")
+    chat_window_fast_project.send_message()
     
     # Verify all commands were executed and displayed
-    cmd_content = chat_window_with_project.ui.cmd_display.toPlainText()
-    assert "Executing 2 commands sequentially" in cmd_content
-    assert "List directory contents" in cmd_content
-    assert "Print hello message" in cmd_content
-    assert "Output:\nDirectory listing output" in cmd_content
-    assert "Output:\nHello" in cmd_content
-
-def test_file_write_operation(chat_window_with_project, temp_dir):
+    cmd_content = _display_text(chat_window_fast_project.ui.cmd_display)
+    _assert_contains(
+        cmd_content,
+        "Executing 2 commands sequentially",
+        "List directory contents",
+        "Print hello message",
+        "Output:\nDirectory listing output",
+        "Output:\nHello",
+    )
+
+def test_file_write_operation(project_executor, temp_dir):
     """Test writing content to a file using echo command."""
     test_file = os.path.join(temp_dir, "test_project", "test.txt")
     test_content = "Hello, World!"
     command = f'echo {test_content} > {test_file}'
     
     # Execute command
-    stdout, stderr, is_safe = chat_window_with_project.command_executor.execute_command(command)
+    stdout, stderr, is_safe = project_executor.execute_command(command)
     
     # Verify command execution
     assert is_safe is True
@@ -398,13 +460,11 @@ def test_file_write_operation(chat_window_with_project, temp_dir):
         content = f.read()
         assert content.strip() == test_content
 
-def test_large_file_write_operation(chat_window_with_project, temp_dir):
+def test_large_file_write_operation(project_executor, temp_dir, large_blob):
     """Test writing large content to a file in chunks."""
     test_file = os.path.join(temp_dir, "test_project", "large.txt")
-    # Create content larger than chunk size (8KB)
-    test_content = "Large content! " * 1000  # Much larger than CHUNK_SIZE
     
-    success, error = chat_window_with_project.command_executor.safe_write_file(test_file, test_content)
+    success, error = project_executor.safe_write_file(test_file, large_blob)
     
     # Verify write operation
     assert success is True
@@ -413,9 +473,9 @@ def test_large_file_write_operation(chat_window_with_project, temp_dir):
     # Verify file contents
     with open(test_file, 'r') as f:
         content = f.read()
-        assert content == test_content
+        assert content == large_blob
 
-def test_file_read_operation(chat_window_with_project, temp_dir):
+def test_file_read_operation(project_executor, temp_dir):
     """Test reading content from a file."""
     test_file = os.path.join(temp_dir, "test_project", "read_test.txt")
     test_content = "Test content for reading"
@@ -425,13 +485,13 @@ def test_file_read_operation(chat_window_with_project, temp_dir):
         f.write(test_content)
     
     # Read file using safe_read_file
-    content, error = chat_window_with_project.command_executor.safe_read_file(test_file)
+    content, error = project_executor.safe_read_file(test_file)
     
     # Verify read operation
     assert error is None
     assert content == test_content
 
-def test_file_copy_operation(chat_window_with_project, temp_dir):
+def test_file_copy_operation(project_executor, temp_dir):
     """Test copying a file within project directory."""
     src_file = os.path.join(temp_dir, "test_project", "source.txt")
     dst_file = os.path.join(temp_dir, "test_project", "destination.txt")
@@ -442,7 +502,7 @@ def test_file_copy_operation(chat_window_with_project, temp_dir):
         f.write(test_content)
     
     # Copy file using safe_copy_file
-    success, error = chat_window_with_project.command_executor.safe_copy_file(src_file, dst_file)
+    success, error = project_executor.safe_copy_file(src_file, dst_file)
     
     # Verify copy operation
     assert success is True
@@ -454,36 +514,36 @@ def test_file_copy_operation(chat_window_with_project, temp_dir):
         content = f.read()
         assert content == test_content
 
-def test_file_operations_outside_project(chat_window_with_project, temp_dir):
+def test_file_operations_outside_project(project_executor, temp_dir):
     """Test that file operations outside project directory are blocked."""
     outside_file = os.path.join(temp_dir, "outside.txt")
     test_content = "This should not be written"
     
     # Test write operation
-    success, error = chat_window_with_project.command_executor.safe_write_file(outside_file, test_content)
+    success, error = project_executor.safe_write_file(outside_file, test_content)
     assert success is False
     assert "outside project directory" in error
     assert not os.path.exists(outside_file)
     
     # Test read operation
-    content, error = chat_window_with_project.command_executor.safe_read_file(outside_file)
+    content, error = project_executor.safe_read_file(outside_file)
     assert content is None
     assert "outside project directory" in error
     
     # Test copy operation (both source and destination outside)
     dst_file = os.path.join(temp_dir, "outside_copy.txt")
-    success, error = chat_window_with_project.command_executor.safe_copy_file(outside_file, dst_file)
+    success, error = project_executor.safe_copy_file(outside_file, dst_file)
     assert success is False
     assert "outside project directory" in error
 
-def test_directory_creation(chat_window_with_project, temp_dir):
+def test_directory_creation(project_executor, temp_dir):
     """Test creating nested directories within project directory."""
     test_dir = os.path.join(temp_dir, "test_project", "nested", "subdirectory")
     test_file = os.path.join(test_dir, "test.txt")
     test_content = "Test content in nested directory"
     
     # Write file to nested directory (should create directories)
-    success, error = chat_window_with_project.command_executor.safe_write_file(test_file, test_content)
+    success, error = project_executor.safe_write_file(test_file, test_content)
     
     # Verify directory creation and file write
     assert success is True
@@ -496,22 +556,22 @@ def test_directory_creation(chat_window_with_project, temp_dir):
         content = f.read()
         assert content == test_content
 
-def test_unicode_content_handling(chat_window_with_project, temp_dir):
+def test_unicode_content_handling(project_executor, temp_dir):
     """Test handling of unicode content in file operations."""
     test_file = os.path.join(temp_dir, "test_project", "unicode.txt")
     test_content = "Hello, 世界! 👋 🌍"  # Unicode text with emojis
     
     # Write unicode content
-    success, error = chat_window_with_project.command_executor.safe_write_file(test_file, test_content)
+    success, error = project_executor.safe_write_file(test_file, test_content)
     assert success is True
     assert error is None
     
     # Read back and verify content
-    content, error = chat_window_with_project.command_executor.safe_read_file(test_file)
+    content, error = project_executor.safe_read_file(test_file)
     assert error is None
     assert content == test_content
 
-def test_path_security(chat_window_with_project, temp_dir):
+def test_path_security(project_executor):
     """Test path security checks for various path formats."""
     test_paths = [
         ("../outside.txt", False),  # Parent directory
@@ -519,15 +579,19 @@ def test_path_security(chat_window_with_project, temp_dir):
         ("~/file.txt", False),      # Home directory
         ("normal.txt", True),       # Simple filename
         ("subfolder/file.txt", True), # Nested path
-        ("C:/absolute/path.txt", False), # Absolute path
+        (_OUTSIDE_PATH, False),     # Absolute path outside the project
         ("\x00malicious.txt", False),  # Null byte injection
     ]
     
     for path, expected_safe in test_paths:
-        full_path = os.path.join(temp_dir, "test_project", path)
-        assert chat_window_with_project.command_executor.is_path_in_project(path) == expected_safe
+        assert project_executor.is_path_in_project(path) == expected_safe
+
+@_windows_only
+def test_path_security_rejects_absolute_drive_path(project_executor):
+    """Test that an absolute drive path outside the project is rejected."""
+    assert not project_executor.is_path_in_project("C:/absolute/path.txt")
 
-def test_file_write_with_quotes(chat_window_with_project, temp_dir):
+def test_file_write_with_quotes(project_executor, temp_dir):
     """Test writing content to a file with quotes in the content."""
     test_file = os.path.join(temp_dir, "test_project", "quoted.txt")
     test_cases = [
@@ -538,7 +602,7 @@ def test_file_write_with_quotes(chat_window_with_project, temp_dir):
     
     for command, expected in test_cases:
         # Execute command
-        stdout, stderr, is_safe = chat_window_with_project.command_executor.execute_command(command)
+        stdout, stderr, is_safe = project_executor.execute_command(command)
         
         # Verify command execution
         assert is_safe is True
@@ -550,78 +614,18 @@ def test_file_write_with_quotes(chat_window_with_project, temp_dir):
             content = f.read()
             assert content.strip() == expected
 
-def test_file_write_with_here_string(chat_window_with_project, temp_dir):
-    """Test writing multi-line content using PowerShell here-string syntax."""
-    test_file = os.path.join(temp_dir, "test_project", "multiline.py")
-    command = """$code = @'
-def hello():
-    print("Hello, World!")
-    return 42
-
-if __name__ == "__main__":
-    result = hello()
-    print(f"Result: {result}")
-'@ > """ + test_file
-    
-    # Execute command
-    stdout, stderr, is_safe = chat_window_with_project.command_executor.execute_command(command)
-    
-    # Verify command execution
-    assert is_safe is True
-    assert stdout == "File written successfully"
-    assert stderr is None
-    
-    # Verify file contents
-    with open(test_file, 'r') as f:
-        content = f.read()
-        expected = '''def hello():
-    print("Hello, World!")
-    return 42
-
-if __name__ == "__main__":
-    result = hello()
-    print(f"Result: {result}")'''
-        assert content.strip() == expected.strip()
-
-def test_file_write_with_set_content(chat_window_with_project, temp_dir):
-    """Test writing multi-line content using PowerShell Set-Content command."""
-    test_file = os.path.join(temp_dir, "test_project", "set_content_test.py")
-    content = '''"""
-def hello():
-    print("Hello, World!")
-    return 42
-
-if __name__ == "__main__":
-    result = hello()
-    print(f"Result: {result}")
-"""'''
-    command = f'Set-Content -Path {test_file} -Value {content}'
-    
-    # Execute command
-    stdout, stderr, is_safe = chat_window_with_project.command_executor.execute_command(command)
-    
-    # Verify command execution
-    assert is_safe is True
-    assert stdout == "File written successfully"
-    assert stderr is None
-    
-    # Verify file contents
-    with open(test_file, 'r') as f:
-        written_content = f.read()
-        expected = '''def hello():
-    print("Hello, World!")
-    return 42
-
-if __name__ == "__main__":
-    result = hello()
-    print(f"Result: {result}")'''
-        assert written_content.strip() == expected.strip()
-
-def test_file_write_with_set_content_python_script(chat_window_with_project, temp_dir):
-    """Test writing Python script with Set-Content, verifying quote and newline handling."""
-    test_file = os.path.join(temp_dir, "test_project", "test_script.py")
-    # Use raw string to handle backslashes and escaping properly
-    command = r'''Set-Content -Path {} -Value @"
+def test_powershell_write_variants(project_executor, temp_dir):
+    """Test writing files with PowerShell here-string and Set-Content command variants."""
+    project_path = os.path.join(temp_dir, "test_project")
+    # (file name, command with a <PATH> placeholder, expected content) - a str is the
+    # exact content after stripping, a tuple lists substrings the content must contain
+    variants = [
+        # Here-string redirected to a file
+        ("multiline.py", "$code = @'\n" + _HELLO_SCRIPT + "\n'@ > <PATH>", _HELLO_SCRIPT),
+        # Set-Content with a triple-quoted value
+        ("set_content_test.py", 'Set-Content -Path <PATH> -Value """\n' + _HELLO_SCRIPT + '\n"""', _HELLO_SCRIPT),
+        # Set-Content with a here-string, verifying quote and docstring handling
+        ("test_script.py", r'''Set-Content -Path <PATH> -Value @"
 # Sample Python script
 def calculate_sum(numbers):
     """Returns the sum of a list of numbers."""
@@ -630,55 +634,44 @@ def calculate_sum(numbers):
 def main():
     numbers = [1, 2, 3, 4, 5]
     result = calculate_sum(numbers)
-    print(f"The sum is: {{result}}")
+    print(f"The sum is: {result}")
 
 if __name__ == '__main__':
     main()
-"@'''.format(test_file)
-    
-    # Execute command
-    stdout, stderr, is_safe = chat_window_with_project.command_executor.execute_command(command)
-    
-    # Verify command execution
-    assert is_safe is True
-    assert stdout == "File written successfully"
-    assert stderr is None
-    
-    # Verify file contents and proper handling of quotes and docstrings
-    with open(test_file, 'r') as f:
-        content = f.read()
-        assert '"""Returns the sum of a list of numbers."""' in content
-        assert "if __name__ == '__main__':" in content
-        assert 'print(f"The sum is: {result}")' in content
-
-def test_file_write_with_set_content_single_line(chat_window_with_project, temp_dir):
-    """Test writing content using PowerShell Set-Content command with single line format."""
-    test_file = os.path.join(temp_dir, "test_project", "single_line.py")
-    
-    # Single line format that should work more reliably
-    command = f'Set-Content -Path {test_file} -Value "print(\'Hello from single line\')"'
-    
-    # Execute command
-    stdout, stderr, is_safe = chat_window_with_project.command_executor.execute_command(command)
-    
-    # Verify command execution
-    assert is_safe is True
-    assert stdout == "File written successfully"
-    assert stderr is None
+"@''', (
+            '"""Returns the sum of a list of numbers."""',
+            "if __name__ == '__main__':",
+            'print(f"The sum is: {result}")',
+        )),
+        # Set-Content with a single line value
+        ("single_line.py", 'Set-Content -Path <PATH> -Value "print(\'Hello from single line\')"',
+         "print('Hello from single line')"),
+    ]
     
-    # Verify file contents
-    with open(test_file, 'r') as f:
-        content = f.read()
-        assert content.strip() == "print('Hello from single line')"
+    for file_name, command, expected in variants:
+        test_file = os.path.join(project_path, file_name)
+        
+        # Execute command
+        stdout, stderr, is_safe = project_executor.execute_command(command.replace("<PATH>", test_file))
+        
+        # Verify command execution
+        assert (is_safe, stdout, stderr) == (True, "File written successfully", None), file_name
+        
+        # Verify file contents
+        with open(test_file, 'r') as f:
+            content = f.read()
+        if isinstance(expected, str):
+            assert content.strip() == expected, file_name
+        else:
+            _assert_contains(content, *expected)
 
-def test_file_write_with_add_content(chat_window_with_project, temp_dir):
+def test_file_write_with_add_content(project_executor, temp_dir):
     """Test writing multi-line content using PowerShell Add-Content command."""
     test_file = os.path.join(temp_dir, "test_project", "add_content_test.py")
     
-    # First create empty file
-    command_create = f'New-Item -Path {test_file} -ItemType File'
-    stdout, stderr, is_safe = chat_window_with_project.command_executor.execute_command(command_create)
-    assert is_safe is True
+    # First create empty file (directly, so the test doesn't need a PowerShell session)
+    success, error = project_executor.safe_write_file(test_file, "")
+    assert success is True
     
     # Then add content
     command_add = f'''Add-Content -Path {test_file} -Value @"
@@ -696,7 +689,7 @@ if __name__ == '__main__':
 "@'''
     
     # Execute command
-    stdout, stderr, is_safe = chat_window_with_project.command_executor.execute_command(command_add)
+    stdout, stderr, is_safe = project_executor.execute_command(command_add)
     
     # Verify command execution
     assert is_safe is True
@@ -710,7 +703,19 @@ if __name__ == '__main__':
         assert 'print(\'First 20 primes:\'' in content
         assert content.count('\n') >= 8  # Check that line breaks are preserved
 
-def test_file_write_with_literal_newlines(chat_window_with_project, temp_dir):
+@pytest.mark.powershell
+def test_powershell_session_command(project_executor, temp_dir):
+    """Test running a command through the real persistent PowerShell session."""
+    test_file = os.path.join(temp_dir, "test_project", "new_item.txt")
+    
+    # Execute command
+    stdout, stderr, is_safe = project_executor.execute_command(f'New-Item -Path {test_file} -ItemType File')
+    
+    # Verify command execution
+    assert is_safe is True
+    assert os.path.exists(test_file)
+
+def test_file_write_with_literal_newlines(project_executor, temp_dir):
     """Test writing Python code with literal \n being properly converted to actual newlines."""
     test_file = os.path.join(temp_dir, "test_project", "newline_test.py")
     
@@ -720,7 +725,7 @@ def test_file_write_with_literal_newlines(chat_window_with_project, temp_dir):
     command = f'Set-Content -Path {test_file} -Value "{python_code}"'
     
     # Execute command
-    stdout, stderr, is_safe = chat_window_with_project.command_executor.execute_command(command)
+    stdout, stderr, is_safe = project_executor.execute_command(command)
     
     # Verify command execution
     assert is_safe is True